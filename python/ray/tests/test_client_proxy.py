@@ -1,7 +1,12 @@
+from collections import deque
+from concurrent import futures
 import os
 import pickle
 import pytest
+import redis
+import socket
 import sys
+import threading
 import time
 
 import grpc
@@ -24,11 +29,10 @@ def test_proxy_manager_lifecycle(shutdown_only):
     4. The ProxyManager returns the port of the destructed SpecificServer.
     """
     ray_instance = ray.init()
-    proxier.CHECK_PROCESS_INTERVAL_S = 1
     os.environ["TIMEOUT_FOR_SPECIFIC_SERVER_S"] = "5"
     pm = proxier.ProxyManager(ray_instance["redis_address"],
                               ray_instance["session_dir"])
-    pm._free_ports = [45000, 45001]
+    pm._free_ports = deque([45000, 45001])
     client = "client1"
 
     assert pm.start_specific_server(client, JobConfig())
@@ -39,7 +43,7 @@ def test_proxy_manager_lifecycle(shutdown_only):
     assert proc.port == 45000
 
     proc.process_handle().process.wait(10)
-    # Wait for reconcile loop
+    # Wait for the process watcher to release the server
     time.sleep(2)
 
     assert len(pm._free_ports) == 2
@@ -55,18 +59,17 @@ def test_proxy_manager_bad_startup(shutdown_only):
     that it is properly GC'd
     """
     ray_instance = ray.init()
-    proxier.CHECK_PROCESS_INTERVAL_S = 1
     proxier.CHECK_CHANNEL_TIMEOUT_S = 1
     pm = proxier.ProxyManager(ray_instance["redis_address"],
                               ray_instance["session_dir"])
-    pm._free_ports = [46000, 46001]
+    pm._free_ports = deque([46000, 46001])
     client = "client1"
 
     assert not pm.start_specific_server(
         client,
         JobConfig(
             runtime_env={"conda": "conda-env-that-sadly-does-not-exist"}))
-    # Wait for reconcile loop
+    # Wait for the process watcher to release the server
     time.sleep(2)
     assert pm.get_channel(client) is None
 
@@ -97,6 +100,195 @@ def test_multiple_clients_use_different_drivers(call_ray_start):
     assert namespace_one != namespace_two
 
 
+def test_proxy_manager_session_dir(shutdown_only):
+    """
+    Check that the ProxyManager reads the session_dir from Redis when it is
+    not given one.
+    """
+    ray_instance = ray.init()
+    pm = proxier.ProxyManager(ray_instance["redis_address"])
+    assert pm._get_session_dir() == ray_instance["session_dir"]
+
+
+def test_proxy_manager_session_dir_fallback(call_ray_start, monkeypatch):
+    """
+    Check that the ProxyManager falls back to connecting a driver when the
+    session_dir cannot be read from Redis.
+    """
+    address = call_ray_start
+    session_dir = ray.init(address=address)["session_dir"]
+    ray.shutdown()
+
+    def fail_redis_client(*args, **kwargs):
+        raise redis.exceptions.ConnectionError()
+
+    monkeypatch.setattr(proxier, "create_redis_client", fail_redis_client)
+    pm = proxier.ProxyManager(address)
+    assert pm._get_session_dir() == session_dir
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"),
+    reason="SO_REUSEPORT semantics differ across platforms.")
+def test_proxy_manager_skips_reuseport_port():
+    """
+    Check that a port held by a listening SO_REUSEPORT socket (as gRPC servers
+    use) is not handed out.
+    """
+    pm = proxier.ProxyManager("localhost:6379", "/tmp/ray/session_test")
+    held = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    held.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    held.bind(("", 0))
+    held.listen()
+    held_port = held.getsockname()[1]
+    try:
+        pm._free_ports = deque([held_port, 47001])
+        assert pm._get_unused_port() == 47001
+        assert list(pm._free_ports) == [held_port]
+    finally:
+        held.close()
+        pm._release_port(47001)
+
+
+def test_proxy_manager_wait_for_server():
+    """
+    Check that `wait_for_server` wakes up once a SpecificServer is registered
+    and times out otherwise.
+    """
+    pm = proxier.ProxyManager("localhost:6379", "/tmp/ray/session_test")
+    assert not pm.wait_for_server("client1", 0.1)
+
+    handle_ready = futures.Future()
+    handle_ready.set_result(None)
+    server = proxier.SpecificServer(
+        port=47000,
+        process_handle_future=handle_ready,
+        channel=None,
+        channel_ready=False,
+        raylet_methods=None,
+        data_stub=None,
+        log_stub=None)
+
+    def register():
+        time.sleep(0.5)
+        with pm._servers_lock:
+            pm.servers["client1"] = server
+            pm._server_added.notify_all()
+
+    threading.Thread(target=register).start()
+    assert pm.wait_for_server("client1", 5)
+    # There is no process to clean up at exit.
+    del pm.servers["client1"]
+
+
+def test_proxy_manager_wait_for_server_slow_startup():
+    """
+    Check that `wait_for_server` only bounds server registration, and keeps
+    waiting for a registered server whose startup outlasts the timeout.
+    """
+    pm = proxier.ProxyManager("localhost:6379", "/tmp/ray/session_test")
+    handle_ready = futures.Future()
+    server = proxier.SpecificServer(
+        port=47000,
+        process_handle_future=handle_ready,
+        channel=None,
+        channel_ready=False,
+        raylet_methods=None,
+        data_stub=None,
+        log_stub=None)
+    with pm._servers_lock:
+        pm.servers["client1"] = server
+        pm._server_added.notify_all()
+
+    def finish_startup():
+        time.sleep(1)
+        handle_ready.set_result(None)
+
+    threading.Thread(target=finish_startup).start()
+    assert pm.wait_for_server("client1", 0.1)
+    assert handle_ready.done()
+    # There is no process to clean up at exit.
+    del pm.servers["client1"]
+
+
+def test_raylet_servicer_proxy_ping():
+    """
+    Check that PING requests are answered by the proxy itself, operating on
+    serialized messages.
+    """
+    pm = proxier.ProxyManager("localhost:6379", "/tmp/ray/session_test")
+    servicer = proxier.RayletServicerProxy(None, pm)
+    req = ray_client_pb2.ClusterInfoRequest(
+        type=ray_client_pb2.ClusterInfoType.PING)
+    resp = servicer.ClusterInfo(req.SerializeToString())
+    assert ray_client_pb2.ClusterInfoResponse.FromString(resp).json == "{}"
+
+
+def test_raylet_servicer_proxy_forwards_to_same_method():
+    """
+    Check that each proxied method is forwarded to the method of the same
+    name on the SpecificServer.
+    """
+    pm = proxier.ProxyManager("localhost:6379", "/tmp/ray/session_test")
+    servicer = proxier.RayletServicerProxy(None, pm)
+    servicer._call_inner_function = lambda request, context, method: method
+    for method in proxier.RAYLET_DRIVER_METHODS:
+        if method != "ClusterInfo":
+            assert getattr(servicer, method)(b"", None) == method
+
+
+def test_raylet_servicer_proxy_forwards_bytes():
+    """
+    Check that the proxy servicer, registered on a real gRPC server, forwards
+    requests without a deadline to the same method of the SpecificServer and
+    returns its response bytes unchanged.
+    """
+    received = []
+
+    def make_echo(method):
+        def echo(request, context):
+            received.append((method, request))
+            return request
+
+        return echo
+
+    echo_handlers = {
+        method: grpc.unary_unary_rpc_method_handler(make_echo(method))
+        for method in proxier.RAYLET_DRIVER_METHODS
+    }
+    echo_server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    echo_server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(
+        proxier.RAYLET_DRIVER_SERVICE, echo_handlers), ))
+    echo_port = echo_server.add_insecure_port("localhost:0")
+    echo_server.start()
+    echo_channel = grpc.insecure_channel(f"localhost:{echo_port}")
+
+    pm = proxier.ProxyManager("localhost:6379", "/tmp/ray/session_test")
+    pm.get_raylet_methods = lambda client_id: {
+        method: echo_channel.unary_unary(
+            f"/{proxier.RAYLET_DRIVER_SERVICE}/{method}")
+        for method in proxier.RAYLET_DRIVER_METHODS
+    }
+    proxy_server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    proxier.add_raylet_servicer_proxy_to_server(
+        proxier.RayletServicerProxy(None, pm), proxy_server)
+    proxy_port = proxy_server.add_insecure_port("localhost:0")
+    proxy_server.start()
+
+    try:
+        with grpc.insecure_channel(f"localhost:{proxy_port}") as channel:
+            kv_del = channel.unary_unary(
+                f"/{proxier.RAYLET_DRIVER_SERVICE}/KVDel")
+            resp = kv_del(
+                b"\x00\x01payload", metadata=[("client_id", "client1")])
+        assert resp == b"\x00\x01payload"
+        assert received == [("KVDel", b"\x00\x01payload")]
+    finally:
+        proxy_server.stop(0)
+        echo_channel.close()
+        echo_server.stop(0)
+
+
 def test_prepare_runtime_init_req_fails():
     """
     Check that a connection that is initiated with a non-Init request
@@ -112,11 +304,14 @@ def test_prepare_runtime_init_req_no_modification():
     Check that `prepare_runtime_init_req` properly extracts the JobConfig.
     """
     job_config = JobConfig(worker_env={"KEY": "VALUE"}, ray_namespace="abc")
+    serialized_job_config = pickle.dumps(job_config)
     init_req = ray_client_pb2.DataRequest(
-        init=ray_client_pb2.InitRequest(job_config=pickle.dumps(job_config)))
+        init=ray_client_pb2.InitRequest(job_config=serialized_job_config))
     req, new_config = proxier.prepare_runtime_init_req(iter([init_req]))
     assert new_config.serialize() == job_config.serialize()
     assert isinstance(req, ray_client_pb2.DataRequest)
+    # The serialized JobConfig is forwarded without being re-pickled.
+    assert req.init.job_config == serialized_job_config
     assert pickle.loads(
         req.init.job_config).serialize() == new_config.serialize()
 
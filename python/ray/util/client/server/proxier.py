@@ -1,55 +1,127 @@
 import atexit
+from collections import deque
 from concurrent import futures
 from dataclasses import dataclass
 import grpc
 import logging
 import json
+import os
 import psutil
-from queue import Queue
+import redis
 import socket
 import sys
-from threading import Thread, RLock
+from threading import Condition, Lock, Thread
 import time
-from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from typing import (Any, Callable, Deque, Dict, Iterable, Iterator, Optional,
+                    Tuple)
 
 import ray
+from ray import ray_constants
 from ray.cloudpickle.compat import pickle
 from ray.job_config import JobConfig
 import ray.core.generated.ray_client_pb2 as ray_client_pb2
 import ray.core.generated.ray_client_pb2_grpc as ray_client_pb2_grpc
 from ray.util.client.common import (ClientServerHandle,
                                     CLIENT_SERVER_MAX_THREADS, GRPC_OPTIONS)
-from ray._private.services import ProcessInfo, start_ray_client_server
-from ray._private.utils import detect_fate_sharing_support
+from ray._private.services import (ProcessInfo, create_redis_client,
+                                   start_ray_client_server)
+from ray._private.utils import decode, detect_fate_sharing_support
 
 logger = logging.getLogger(__name__)
 
-CHECK_PROCESS_INTERVAL_S = 30
-
 MIN_SPECIFIC_SERVER_PORT = 23000
 MAX_SPECIFIC_SERVER_PORT = 24000
 
 CHECK_CHANNEL_TIMEOUT_S = 10
 
+# How long a Logstream waits for the Datapath of the same client to register
+# its SpecificServer.
+LOGSTREAM_SERVER_TIMEOUT_S = 10
+
+# Bounds for the exponential backoff used while waiting for a SpecificServer
+# to transition from the shim process to the actual RayClient Server.
+STARTUP_POLL_INITIAL_S = 0.005
+STARTUP_POLL_MAX_S = 0.2
+
+# Size of the proxier's gRPC thread pool. Each connected client occupies two
+# threads for the lifetime of its Datapath and Logstream streams, so this
+# bounds the number of concurrent clients to about half its value. Threads are
+# only spawned on demand, so a large bound costs nothing while idle.
+CLIENT_PROXY_MAX_THREADS = int(
+    os.getenv("RAY_CLIENT_SERVER_CONCURRENCY", CLIENT_SERVER_MAX_THREADS))
+
+# Whether ports handed to SpecificServers are kept bound by the proxier until
+# the server exits. The reservation uses SO_REUSEPORT, which gRPC servers also
+# set on Linux, so the SpecificServer can still bind. It only keeps out
+# sockets that do not set SO_REUSEPORT themselves; detecting ports already in
+# use is left to the plain bind probe in `_get_unused_port`.
+RESERVE_PORTS = sys.platform.startswith("linux")
+
+# Fully qualified name and methods of the RayletDriver service, which the
+# proxy forwards as raw bytes.
+RAYLET_DRIVER_SERVICE = "ray.rpc.RayletDriver"
+RAYLET_DRIVER_METHODS = ("Init", "PrepRuntimeEnv", "GetObject", "PutObject",
+                         "WaitObject", "Schedule", "Terminate", "ClusterInfo",
+                         "KVGet", "KVPut", "KVDel", "KVList", "KVExists")
+
+# Serialized response to ClusterInfo PING requests, which never changes.
+_PING_RESPONSE = ray_client_pb2.ClusterInfoResponse(
+    json=json.dumps({})).SerializeToString()
+
+# Number of lock stripes guarding per-client state in the ProxyManager.
+NUM_SERVER_LOCK_STRIPES = 16
+
 
 def _get_client_id_from_context(context: Any) -> str:
     """
     Get `client_id` from gRPC metadata. If the `client_id` is not present,
     this function logs an error and sets the status_code.
     """
-    metadata = {k: v for k, v in context.invocation_metadata()}
-    client_id = metadata.get("client_id") or ""
+    client_id = ""
+    for key, value in context.invocation_metadata():
+        if key == "client_id":
+            client_id = value or ""
+            break
     if client_id == "":
         logger.error("Client connecting with no client_id")
         context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
     return client_id
 
 
+def _reached_client_server(pid: int, psutil_proc: psutil.Process) -> bool:
+    """
+    Check whether the process has transitioned from the shim process to the
+    actual RayClient Server. On Linux, this reads `/proc/<pid>/cmdline`
+    directly instead of building the full argument list through `psutil`.
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                parts = f.read().split(b"\0", 4)
+        except OSError:
+            return False
+        return len(parts) > 3 and parts[2] == b"ray.util.client.server"
+    cmd = psutil_proc.cmdline()
+    return len(cmd) > 3 and cmd[2] == "ray.util.client.server"
+
+
 @dataclass
 class SpecificServer:
+    # `dataclass(slots=True)` requires Python 3.10, and explicit `__slots__`
+    # rule out field defaults, so every field must be passed to `__init__`.
+    __slots__ = ("port", "process_handle_future", "channel", "channel_ready",
+                 "raylet_methods", "data_stub", "log_stub")
     port: int
     process_handle_future: futures.Future
     channel: "grpc._channel.Channel"
+    # Set once `channel` has been observed ready, so that the readiness check
+    # only runs once per server.
+    channel_ready: bool
+    # Callables for each RayletDriver method on `channel`, created lazily.
+    raylet_methods: Optional[Dict[str, Callable]]
+    # Streaming stubs on `channel`, created lazily and reused across sessions.
+    data_stub: Optional[ray_client_pb2_grpc.RayletDataStreamerStub]
+    log_stub: Optional[ray_client_pb2_grpc.RayletLogStreamerStub]
 
     def wait_ready(self, timeout: Optional[float] = None) -> None:
         """
@@ -65,37 +137,76 @@ class SpecificServer:
 class ProxyManager():
     def __init__(self, redis_address: str, session_dir: Optional[str] = None):
         self.servers: Dict[str, SpecificServer] = dict()
-        self.server_lock = RLock()
+        # `_servers_lock` only guards mutation of `servers`. The stripe
+        # returned from `_get_server_lock` only guards the lazy creation of
+        # a SpecificServer's `raylet_methods`, `data_stub` and `log_stub`.
+        self._servers_lock = Lock()
+        # Notified whenever a SpecificServer is added to `servers`.
+        self._server_added = Condition(self._servers_lock)
+        self._server_locks = [Lock() for _ in range(NUM_SERVER_LOCK_STRIPES)]
+        self._free_ports_lock = Lock()
         self.redis_address = redis_address
-        self._free_ports: List[int] = list(
+        self._free_ports: Deque[int] = deque(
             range(MIN_SPECIFIC_SERVER_PORT, MAX_SPECIFIC_SERVER_PORT))
-
-        self._check_thread = Thread(target=self._check_processes, daemon=True)
-        self._check_thread.start()
+        # Sockets holding ports handed out by `_get_unused_port` until they
+        # are released. Guarded by `_free_ports_lock`.
+        self._port_reservations: Dict[int, socket.socket] = dict()
 
         self.fate_share = bool(detect_fate_sharing_support())
         self._session_dir: str = session_dir or ""
         atexit.register(self._cleanup)
 
+    def _get_server_lock(self, client_id: str) -> Lock:
+        """
+        Return the lock stripe responsible for `client_id`.
+        """
+        return self._server_locks[hash(client_id) % len(self._server_locks)]
+
     def _get_unused_port(self) -> int:
         """
-        Search for a port in _free_ports that is unused.
+        Search for a port in _free_ports that is unused. Where supported,
+        the port then stays reserved until `_release_port` is called.
         """
-        with self.server_lock:
+        with self._free_ports_lock:
             num_ports = len(self._free_ports)
-            for _ in range(num_ports):
-                port = self._free_ports.pop(0)
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                try:
+        for _ in range(num_ports):
+            with self._free_ports_lock:
+                if not self._free_ports:
+                    break
+                port = self._free_ports.popleft()
+            # Probe the port outside of the lock so that concurrent clients
+            # are not serialized behind socket syscalls. The probe must not set
+            # SO_REUSEPORT, or it would succeed on ports held by other gRPC
+            # servers.
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            try:
+                s.bind(("", port))
+                s.close()
+                if RESERVE_PORTS:
+                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
                     s.bind(("", port))
-                except OSError:
+            except OSError:
+                s.close()
+                with self._free_ports_lock:
                     self._free_ports.append(port)
-                    continue
-                finally:
-                    s.close()
-                return port
+                continue
+            if RESERVE_PORTS:
+                with self._free_ports_lock:
+                    self._port_reservations[port] = s
+            return port
         raise RuntimeError("Unable to succeed in selecting a random port.")
 
+    def _release_port(self, port: int) -> None:
+        """
+        Return a port obtained from `_get_unused_port` to _free_ports.
+        """
+        with self._free_ports_lock:
+            reservation = self._port_reservations.pop(port, None)
+            if reservation is not None:
+                reservation.close()
+            self._free_ports.append(port)
+
     def _get_session_dir(self) -> str:
         """
         Gets the session_dir of this running Ray session. This usually
@@ -103,6 +214,19 @@ class ProxyManager():
         """
         if self._session_dir:
             return self._session_dir
+        # The head node publishes its session_dir to Redis, so read it
+        # directly rather than connecting a full driver.
+        try:
+            redis_client = create_redis_client(
+                self.redis_address,
+                password=ray_constants.REDIS_DEFAULT_PASSWORD)
+            session_dir = redis_client.get("session_dir")
+        except redis.exceptions.RedisError:
+            logger.exception("Failed to read session_dir from Redis.")
+            session_dir = None
+        if session_dir:
+            self._session_dir = decode(session_dir)
+            return self._session_dir
         connection_tuple = ray.init(address=self.redis_address)
         ray.shutdown()
         self._session_dir = connection_tuple["session_dir"]
@@ -114,15 +238,22 @@ class ProxyManager():
         Start up a RayClient Server for an incoming client to
         communicate with. Returns whether creation was successful.
         """
-        with self.server_lock:
-            port = self._get_unused_port()
-            handle_ready = futures.Future()
-            specific_server = SpecificServer(
-                port=port,
-                process_handle_future=handle_ready,
-                channel=grpc.insecure_channel(
-                    f"localhost:{port}", options=GRPC_OPTIONS))
+        port = self._get_unused_port()
+        handle_ready = futures.Future()
+        specific_server = SpecificServer(
+            port=port,
+            process_handle_future=handle_ready,
+            channel=grpc.insecure_channel(
+                f"localhost:{port}", options=GRPC_OPTIONS),
+            channel_ready=False,
+            raylet_methods=None,
+            data_stub=None,
+            log_stub=None)
+        # Only the dictionary insert needs the lock; spawning the server
+        # below happens concurrently with other client admissions.
+        with self._servers_lock:
             self.servers[client_id] = specific_server
+            self._server_added.notify_all()
 
         serialized_runtime_env = job_config.get_serialized_runtime_env()
 
@@ -141,30 +272,54 @@ class ProxyManager():
             psutil_proc = psutil.Process(pid)
         else:
             psutil_proc = None
+        poll_interval_s = STARTUP_POLL_INITIAL_S
         # Don't use `psutil` on Win32
         while psutil_proc is not None:
             if proc.process.poll() is not None:
                 logger.error(
                     f"SpecificServer startup failed for client: {client_id}")
                 break
-            cmd = psutil_proc.cmdline()
-            if len(cmd) > 3 and cmd[2] == "ray.util.client.server":
+            if _reached_client_server(pid, psutil_proc):
                 break
             logger.debug(
                 "Waiting for Process to reach the actual client server.")
-            time.sleep(0.5)
+            time.sleep(poll_interval_s)
+            poll_interval_s = min(poll_interval_s * 2, STARTUP_POLL_MAX_S)
         handle_ready.set_result(proc)
         logger.info(f"SpecificServer started on port: {port} with PID: {pid} "
                     f"for client: {client_id}")
-        return proc.process.poll() is None
+        # Poll before starting the watcher: `Popen.poll` returns None while
+        # another thread is blocked in `Popen.wait`.
+        started = proc.process.poll() is None
+        Thread(
+            target=self._watch_process,
+            args=(client_id, specific_server),
+            daemon=True).start()
+        return started
 
     def _get_server_for_client(self,
                                client_id: str) -> Optional[SpecificServer]:
-        with self.server_lock:
-            client = self.servers.get(client_id)
-            if client is None:
-                logger.error(f"Unable to find channel for client: {client_id}")
-            return client
+        # No lock is taken: a single `dict.get` is atomic under CPython's GIL,
+        # and writers still hold `_servers_lock` while mutating `servers`.
+        client = self.servers.get(client_id)
+        if client is None:
+            logger.error(f"Unable to find channel for client: {client_id}")
+        return client
+
+    def wait_for_server(self, client_id: str, timeout: float) -> bool:
+        """
+        Wait until a SpecificServer has been registered for the given
+        client_id and its process has started. Returns False if no server is
+        registered within `timeout`. Startup itself is not bounded, as it may
+        include setting up a runtime_env.
+        """
+        with self._server_added:
+            if not self._server_added.wait_for(
+                    lambda: client_id in self.servers, timeout=timeout):
+                return False
+            server = self.servers[client_id]
+        server.wait_ready()
+        return True
 
     def get_channel(
             self,
@@ -172,42 +327,114 @@ class ProxyManager():
     ) -> Optional["grpc._channel.Channel"]:
         """
         Find the gRPC Channel for the given client_id. This will block until
-        the server process has started.
+        the server process has started and the channel is ready, returning
+        None if the channel is not ready within CHECK_CHANNEL_TIMEOUT_S.
         """
         server = self._get_server_for_client(client_id)
         if server is None:
             return None
+        if not self._wait_channel_ready(client_id, server):
+            return None
+        return server.channel
+
+    def _wait_channel_ready(self, client_id: str,
+                            server: SpecificServer) -> bool:
+        """
+        Wait for the server to start up and its channel to become ready.
+        Only the first successful call per server pays for the check.
+        """
+        if server.channel_ready:
+            return True
         server.wait_ready()
         try:
             grpc.channel_ready_future(
                 server.channel).result(timeout=CHECK_CHANNEL_TIMEOUT_S)
-            return server.channel
         except grpc.FutureTimeoutError:
             logger.exception(f"Timeout waiting for channel for {client_id}")
+            return False
+        server.channel_ready = True
+        return True
+
+    def get_raylet_methods(self,
+                           client_id: str) -> Optional[Dict[str, Callable]]:
+        """
+        Find the callables for each RayletDriver method of the given
+        client_id's server. They send and receive serialized messages. This
+        will block until the server's channel is ready, like `get_channel`.
+        """
+        server = self._get_server_for_client(client_id)
+        if server is None:
             return None
+        if not self._wait_channel_ready(client_id, server):
+            return None
+        with self._get_server_lock(client_id):
+            if server.raylet_methods is None:
+                # Without (de)serializers, requests and responses are bytes.
+                server.raylet_methods = {
+                    method: server.channel.unary_unary(
+                        f"/{RAYLET_DRIVER_SERVICE}/{method}")
+                    for method in RAYLET_DRIVER_METHODS
+                }
+            return server.raylet_methods
+
+    def get_data_stub(
+            self, client_id: str
+    ) -> Optional[ray_client_pb2_grpc.RayletDataStreamerStub]:
+        """
+        Find the RayletDataStreamerStub for the given client_id. This will
+        block until the server's channel is ready, like `get_channel`.
+        """
+        return self._get_streaming_stub(
+            client_id, "data_stub", ray_client_pb2_grpc.RayletDataStreamerStub)
 
-    def _check_processes(self):
+    def get_log_stub(self, client_id: str
+                     ) -> Optional[ray_client_pb2_grpc.RayletLogStreamerStub]:
+        """
+        Find the RayletLogStreamerStub for the given client_id. This will
+        block until the server's channel is ready, like `get_channel`.
+        """
+        return self._get_streaming_stub(
+            client_id, "log_stub", ray_client_pb2_grpc.RayletLogStreamerStub)
+
+    def _get_streaming_stub(self, client_id: str, attr: str,
+                            stub_class: type) -> Optional[Any]:
+        server = self._get_server_for_client(client_id)
+        if server is None:
+            return None
+        if not self._wait_channel_ready(client_id, server):
+            return None
+        with self._get_server_lock(client_id):
+            stub = getattr(server, attr)
+            if stub is None:
+                stub = stub_class(server.channel)
+                setattr(server, attr, stub)
+            return stub
+
+    def _watch_process(self, client_id: str,
+                       specific_server: SpecificServer) -> None:
         """
-        Keeps the internal servers dictionary up-to-date with running servers.
+        Block until the SpecificServer's process exits, then remove it from
+        the internal servers dictionary and release its port.
+
+        Each server is waited on individually rather than reaping with
+        `os.waitpid(-1, ...)`, which would also reap unrelated children of
+        this process (e.g. Ray processes started by `ray.init`).
         """
-        while True:
-            with self.server_lock:
-                for client_id, specific_server in list(self.servers.items()):
-                    poll_result = specific_server.process_handle(
-                    ).process.poll()
-                    if poll_result is not None:
-                        del self.servers[client_id]
-                        # Port is available to use again.
-                        self._free_ports.append(specific_server.port)
-
-            time.sleep(CHECK_PROCESS_INTERVAL_S)
+        specific_server.process_handle().process.wait()
+        with self._servers_lock:
+            if self.servers.get(client_id) is specific_server:
+                del self.servers[client_id]
+        # Port is available to use again.
+        self._release_port(specific_server.port)
 
     def _cleanup(self) -> None:
         """
         Forcibly kill all spawned RayClient Servers. This ensures cleanup
         for platforms where fate sharing is not supported.
         """
-        for server in self.servers.values():
+        with self._servers_lock:
+            servers = list(self.servers.values())
+        for server in servers:
             try:
                 server.wait_ready(0.1)
                 server.process_handle().process.kill()
@@ -217,96 +444,96 @@ class ProxyManager():
 
 
 class RayletServicerProxy(ray_client_pb2_grpc.RayletDriverServicer):
+    """
+    Forwards RayletDriver requests to the SpecificServer of each client.
+
+    Requests and responses are passed through as serialized bytes, so this
+    servicer must be registered with `add_raylet_servicer_proxy_to_server`
+    rather than the generated `add_RayletDriverServicer_to_server`.
+    """
+
     def __init__(self, ray_connect_handler: Callable,
                  proxy_manager: ProxyManager):
         self.proxy_manager = proxy_manager
         self.ray_connect_handler = ray_connect_handler
 
-    def _call_inner_function(
-            self, request, context,
-            method: str) -> Optional[ray_client_pb2_grpc.RayletDriverStub]:
+    def _call_inner_function(self, request: bytes, context,
+                             method: str) -> Optional[bytes]:
         client_id = _get_client_id_from_context(context)
-        chan = self.proxy_manager.get_channel(client_id)
-        if not chan:
+        methods = self.proxy_manager.get_raylet_methods(client_id)
+        if methods is None:
             logger.error(f"Channel for Client: {client_id} not found!")
             context.set_code(grpc.StatusCode.NOT_FOUND)
             return None
 
-        stub = ray_client_pb2_grpc.RayletDriverStub(chan)
-        return getattr(stub, method)(
-            request, metadata=[("client_id", client_id)])
-
-    def Init(self, request, context=None) -> ray_client_pb2.InitResponse:
-        return self._call_inner_function(request, context, "Init")
-
-    def PrepRuntimeEnv(self, request,
-                       context=None) -> ray_client_pb2.PrepRuntimeEnvResponse:
-        return self._call_inner_function(request, context, "PrepRuntimeEnv")
-
-    def KVPut(self, request, context=None) -> ray_client_pb2.KVPutResponse:
-        return self._call_inner_function(request, context, "KVPut")
+        return methods[method](request, metadata=[("client_id", client_id)])
 
-    def KVGet(self, request, context=None) -> ray_client_pb2.KVGetResponse:
-        return self._call_inner_function(request, context, "KVGet")
-
-    def KVDel(self, request, context=None) -> ray_client_pb2.KVDelResponse:
-        return self._call_inner_function(request, context, "KVGet")
-
-    def KVList(self, request, context=None) -> ray_client_pb2.KVListResponse:
-        return self._call_inner_function(request, context, "KVList")
-
-    def KVExists(self, request,
-                 context=None) -> ray_client_pb2.KVExistsResponse:
-        return self._call_inner_function(request, context, "KVExists")
-
-    def ClusterInfo(self, request,
-                    context=None) -> ray_client_pb2.ClusterInfoResponse:
+    def ClusterInfo(self, request: bytes, context=None) -> bytes:
 
         # NOTE: We need to respond to the PING request here to allow the client
         # to continue with connecting.
-        if request.type == ray_client_pb2.ClusterInfoType.PING:
-            resp = ray_client_pb2.ClusterInfoResponse(json=json.dumps({}))
-            return resp
+        cluster_info_req = ray_client_pb2.ClusterInfoRequest.FromString(
+            request)
+        if cluster_info_req.type == ray_client_pb2.ClusterInfoType.PING:
+            return _PING_RESPONSE
         return self._call_inner_function(request, context, "ClusterInfo")
 
-    def Terminate(self, req, context=None):
-        return self._call_inner_function(req, context, "Terminate")
 
-    def GetObject(self, request, context=None):
-        return self._call_inner_function(request, context, "GetObject")
+def _make_proxy_method(method: str) -> Callable:
+    def proxy_method(self, request: bytes, context=None) -> bytes:
+        return self._call_inner_function(request, context, method)
 
-    def PutObject(self, request: ray_client_pb2.PutRequest,
-                  context=None) -> ray_client_pb2.PutResponse:
-        return self._call_inner_function(request, context, "PutObject")
+    proxy_method.__name__ = method
+    return proxy_method
 
-    def WaitObject(self, request, context=None) -> ray_client_pb2.WaitResponse:
-        return self._call_inner_function(request, context, "WaitObject")
 
-    def Schedule(self, task, context=None) -> ray_client_pb2.ClientTaskTicket:
-        return self._call_inner_function(task, context, "Schedule")
+# Every method other than ClusterInfo is forwarded as-is, so generate them
+# rather than writing out each wrapper by hand.
+for _method in RAYLET_DRIVER_METHODS:
+    if _method != "ClusterInfo":
+        setattr(RayletServicerProxy, _method, _make_proxy_method(_method))
+
+
+def add_raylet_servicer_proxy_to_server(servicer: RayletServicerProxy,
+                                        server: grpc.Server) -> None:
+    """
+    Register `servicer` for the RayletDriver service on `server`. Unlike the
+    generated `add_RayletDriverServicer_to_server`, no (de)serializers are
+    installed, so that messages are forwarded without being parsed.
+    """
+    rpc_method_handlers = {
+        method: grpc.unary_unary_rpc_method_handler(getattr(servicer, method))
+        for method in RAYLET_DRIVER_METHODS
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+        RAYLET_DRIVER_SERVICE, rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler, ))
 
 
 def forward_streaming_requests(grpc_input_generator: Iterator[Any],
-                               output_queue: "Queue") -> None:
+                               initial_requests: Iterable[Any] = ()
+                               ) -> Iterator[Any]:
     """
-    Forwards streaming requests from the grpc_input_generator into the
-    output_queue.
+    Yields `initial_requests` followed by the streaming requests from the
+    grpc_input_generator, ending the stream if reading from it fails.
     """
+    yield from initial_requests
     try:
-        for req in grpc_input_generator:
-            output_queue.put(req)
+        yield from grpc_input_generator
     except grpc.RpcError as e:
-        logger.debug("closing dataservicer reader thread "
+        logger.debug("closing request stream, "
                      f"grpc error reading request_iterator: {e}")
-    finally:
-        # Set the sentinel value for the output_queue
-        output_queue.put(None)
 
 
 def ray_client_server_env_prep(job_config: JobConfig) -> JobConfig:
     return job_config
 
 
+# The no-op default above; while it is in place the serialized JobConfig is
+# forwarded as-is instead of being pickled again.
+_default_env_prep = ray_client_server_env_prep
+
+
 def prepare_runtime_init_req(iterator: Iterator[ray_client_pb2.DataRequest]
                              ) -> Tuple[ray_client_pb2.DataRequest, JobConfig]:
     """
@@ -321,6 +548,8 @@ def prepare_runtime_init_req(iterator: Iterator[ray_client_pb2.DataRequest]
     job_config = JobConfig()
     if req.job_config:
         job_config = pickle.loads(req.job_config)
+        if ray_client_server_env_prep is _default_env_prep:
+            return (init_req, job_config)
     new_job_config = ray_client_server_env_prep(job_config)
     modified_init_req = ray_client_pb2.InitRequest(
         job_config=pickle.dumps(new_job_config))
@@ -342,32 +571,22 @@ class DataServicerProxy(ray_client_pb2_grpc.RayletDataStreamerServicer):
         modified_init_req, job_config = prepare_runtime_init_req(
             request_iterator)
 
-        queue = Queue()
-        queue.put(modified_init_req)
         if not self.proxy_manager.start_specific_server(client_id, job_config):
             logger.error(f"Server startup failed for client: {client_id}, "
                          f"using JobConfig: {job_config}!")
             context.set_code(grpc.StatusCode.ABORTED)
             return None
 
-        channel = self.proxy_manager.get_channel(client_id)
-        if channel is None:
+        stub = self.proxy_manager.get_data_stub(client_id)
+        if stub is None:
             logger.error(f"Channel not found for {client_id}")
             context.set_code(grpc.StatusCode.NOT_FOUND)
             return None
-        stub = ray_client_pb2_grpc.RayletDataStreamerStub(channel)
-        thread = Thread(
-            target=forward_streaming_requests,
-            args=(request_iterator, queue),
-            daemon=True)
-        thread.start()
-        try:
-            resp_stream = stub.Datapath(
-                iter(queue.get, None), metadata=[("client_id", client_id)])
-            for resp in resp_stream:
-                yield resp
-        finally:
-            thread.join(1)
+        resp_stream = stub.Datapath(
+            forward_streaming_requests(request_iterator, [modified_init_req]),
+            metadata=[("client_id", client_id)])
+        for resp in resp_stream:
+            yield resp
 
 
 class LogstreamServicerProxy(ray_client_pb2_grpc.RayletLogStreamerServicer):
@@ -381,48 +600,34 @@ class LogstreamServicerProxy(ray_client_pb2_grpc.RayletLogStreamerServicer):
             return
         logger.debug(f"New data connection from client {client_id}: ")
 
-        channel = None
-        # We need to retry a few times because the LogClient *may* connect
-        # Before the DataClient has finished connecting.
-        for i in range(5):
-            channel = self.proxy_manager.get_channel(client_id)
-
-            if channel is not None:
-                break
-            logger.warning(
-                f"Retrying Logstream connection. {i+1} attempts failed.")
-            time.sleep(2)
-
-        if channel is None:
+        # The LogClient *may* connect before the DataClient has finished
+        # connecting, so wait for its SpecificServer to come up.
+        if not self.proxy_manager.wait_for_server(client_id,
+                                                  LOGSTREAM_SERVER_TIMEOUT_S):
+            logger.error(f"Timeout waiting for server for {client_id}")
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return None
+        stub = self.proxy_manager.get_log_stub(client_id)
+        if stub is None:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             return None
 
-        stub = ray_client_pb2_grpc.RayletLogStreamerStub(channel)
-        queue = Queue()
-        thread = Thread(
-            target=forward_streaming_requests,
-            args=(request_iterator, queue),
-            daemon=True)
-        thread.start()
-        try:
-            resp_stream = stub.Logstream(
-                iter(queue.get, None), metadata=[("client_id", client_id)])
-            for resp in resp_stream:
-                yield resp
-        finally:
-            thread.join(1)
+        resp_stream = stub.Logstream(
+            forward_streaming_requests(request_iterator),
+            metadata=[("client_id", client_id)])
+        for resp in resp_stream:
+            yield resp
 
 
 def serve_proxier(connection_str: str, redis_address: str):
     server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=CLIENT_SERVER_MAX_THREADS),
+        futures.ThreadPoolExecutor(max_workers=CLIENT_PROXY_MAX_THREADS),
         options=GRPC_OPTIONS)
     proxy_manager = ProxyManager(redis_address)
     task_servicer = RayletServicerProxy(None, proxy_manager)
     data_servicer = DataServicerProxy(proxy_manager)
     logs_servicer = LogstreamServicerProxy(proxy_manager)
-    ray_client_pb2_grpc.add_RayletDriverServicer_to_server(
-        task_servicer, server)
+    add_raylet_servicer_proxy_to_server(task_servicer, server)
     ray_client_pb2_grpc.add_RayletDataStreamerServicer_to_server(
         data_servicer, server)
     ray_client_pb2_grpc.add_RayletLogStreamerServicer_to_server(